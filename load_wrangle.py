@@ -10,15 +10,22 @@ Functions:
     clean_data: Cleans and standardizes the extracted data
     split_details: Helper function to parse transaction details
     split_type: Helper function to parse transaction types
+    summarize_categories: Aggregates transactions per category and entity
+    statement_hash: Computes the cache key of an uploaded statement
+    load_cached_data: Reads a cleaned statement from the Parquet cache
+    save_cached_data: Writes a cleaned statement to the Parquet cache
 
 Dependencies:
     - pandas: For data manipulation
     - tabula: For PDF data extraction
     - streamlit: For progress indicators
+    - pyarrow: For the optional Parquet cache
 """
 
 import pandas as pd
 import numpy as np
+import hashlib
+import os
 import re
 import warnings
 import streamlit as st
@@ -38,6 +45,26 @@ EXPECTED_COLUMNS = [
     "Withdrawn",
 ]
 
+# Directory for the on-disk cache of cleaned statements. Disabled unless set,
+# since the cached files contain the user's transactions.
+CACHE_DIR = os.environ.get("MTOP_CACHE_DIR")
+
+# Version of clean_data's output schema stored in the cache. Bump it whenever
+# clean_data adds, drops or retypes a column so stale files are not reused.
+CACHE_SCHEMA_VERSION = 1
+
+# Transaction categories analysed by the dashboard, matched against type_class
+TRANSACTION_CATEGORIES = [
+    "Merchant Payment",
+    "Pay Merchant",
+    "Customer Transfer",
+    "Customer Withdrawal",
+    "Cash Withdrawal",
+    "Airtime",
+    "Pay Bill",
+    "Funds received",
+]
+
 
 # @st.cache_data(show_spinner="Extracting and cleaning your statement...")
 # Step 1: Load and examine raw data
@@ -135,14 +162,17 @@ def clean_data(df):
         df (pd.DataFrame): Raw transaction data DataFrame
 
     Returns:
-        pd.DataFrame: Cleaned and standardized DataFrame with additional
-            computed columns, or exits if cleaning fails
+        pd.DataFrame: Cleaned and standardized DataFrame, sorted by date_time,
+            with additional computed columns, or exits if cleaning fails
 
     Columns added:
         - month: Transaction month in format "Month_YY"
         - week: Transaction week in format "WeekNumber_YY"
+        - month_ord: Monthly period ordinal used for month filtering
         - type_class: Standardized transaction type category
         - type_desc: Detailed transaction type description
+        - type_class_category: Dashboard category matched from type_class
+        - entity_clean: Title-cased entity name without masked phone numbers
     """
     print("\n🧹 Cleaning data...")
     if df is None:
@@ -185,6 +215,12 @@ def clean_data(df):
         df_clean["receipt_no"] = df_clean["receipt_no"].astype("string")
         df_clean["date_time"] = pd.to_datetime(df_clean["date_time"], errors="coerce")
 
+        # Keep transactions in chronological order so date ranges are contiguous slices
+        df_clean = df_clean.sort_values("date_time").reset_index(drop=True)
+
+        # Amounts stay float64: float32 only keeps ~7 significant digits, which
+        # shows up in the cents of statement totals and in the int() truncation
+        # of per-section sums.
         df_clean["withdrawn"] = (
             pd.to_numeric(
                 df_clean["withdrawn"]
@@ -216,10 +252,40 @@ def clean_data(df):
         df_clean[["type_class", "type_desc"]] = df_clean["type"].apply(
             lambda x: pd.Series(split_type(x))
         )
+        # Low-cardinality type columns are categorical so filters compare codes
+        # and string matches only run over the distinct values
+        df_clean["type_class"] = df_clean["type_class"].astype("category")
+        df_clean["type_desc"] = df_clean["type_desc"].astype("category")
+
+        # Arrow-backed strings for the free-text entity column
+        df_clean["entity"] = df_clean["entity"].astype("string[pyarrow]")
+
+        # Drop masked phone numbers from names (e.g. "2547*****123 john doe" -> "John Doe")
+        masked = df_clean["entity"].str.contains("*", regex=False, na=False)
+        df_clean["entity_clean"] = pd.Series(
+            np.where(
+                masked,
+                df_clean["entity"].str.partition(" ")[2].str.title(),
+                df_clean["entity"].str.title(),
+            ),
+            index=df_clean.index,
+            dtype="string[pyarrow]",
+        )
+
+        # Map each type_class to its dashboard category in a single regex pass
+        df_clean["type_class_category"] = (
+            df_clean["type_class"]
+            .str.extract(f"({'|'.join(TRANSACTION_CATEGORIES)})", expand=False)
+            .astype(pd.CategoricalDtype(TRANSACTION_CATEGORIES))
+        )
+
         # Create sortable date columns with first day of month/week
         df_clean["month_sort"] = df_clean["date_time"].dt.to_period('M').dt.to_timestamp()
         df_clean["week_sort"] = df_clean["date_time"].dt.to_period('W').dt.to_timestamp()
         
+        # Integer period ordinal used by the month filter
+        df_clean["month_ord"] = df_clean["date_time"].dt.to_period("M").astype("int64")
+
         # Create display columns with formatted strings
         df_clean["month"] = df_clean["date_time"].dt.strftime("%B_%y")
         df_clean["week"] = df_clean["date_time"].dt.strftime("%V_%y")
@@ -233,5 +299,101 @@ def clean_data(df):
         return df_clean
 
 
+@st.cache_data(show_spinner=False)
+def summarize_categories(df):
+    """
+    Aggregate transaction counts and amounts per category and entity.
+
+    The whole frame is grouped once so each analysis box only has to look
+    up its own category instead of filtering and grouping again.
+
+    Args:
+        df (pd.DataFrame): Cleaned (and optionally filtered) transaction data
+
+    Returns:
+        dict: Maps every entry of TRANSACTION_CATEGORIES to a DataFrame indexed
+            by entity with count and sum of the withdrawn amounts
+    """
+    totals = (
+        df.groupby(["type_class_category", "entity"], observed=True, sort=False)[
+            "withdrawn"
+        ]
+        .agg(count="size", sum="sum")
+        .reset_index(level="type_class_category")
+    )
+
+    return {
+        category: totals.loc[
+            totals["type_class_category"].eq(category), ["count", "sum"]
+        ]
+        for category in TRANSACTION_CATEGORIES
+    }
+
+
+def statement_hash(pdf_bytes, password):
+    """
+    Compute the cache key of an uploaded statement.
+
+    Args:
+        pdf_bytes (bytes): Raw content of the PDF statement
+        password (str): Password for protected PDF files
+
+    Returns:
+        str: SHA-256 hex digest of the PDF content and password
+    """
+    digest = hashlib.sha256(pdf_bytes)
+    digest.update(str(password).encode())
+    return digest.hexdigest()
+
+
+def _cache_path(statement_id):
+    """Return the Parquet file of a statement for the current cache schema."""
+    return os.path.join(CACHE_DIR, f"{statement_id}.v{CACHE_SCHEMA_VERSION}.parquet")
+
+
+def load_cached_data(statement_id):
+    """
+    Read a previously cleaned statement from the Parquet cache.
+
+    Args:
+        statement_id (str): Cache key from statement_hash
+
+    Returns:
+        pd.DataFrame: Cleaned transaction data, or None if caching is
+            disabled or the statement has not been cached
+    """
+    if not CACHE_DIR:
+        return None
+
+    path = _cache_path(statement_id)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        print(f"📦 Loading cached statement: {path}")
+        return pd.read_parquet(path)
+    except Exception as e:
+        print(f"❌ Error reading cached statement: {str(e)}")
+        return None
+
+
+def save_cached_data(statement_id, df):
+    """
+    Write a cleaned statement to the Parquet cache.
+
+    Args:
+        statement_id (str): Cache key from statement_hash
+        df (pd.DataFrame): Cleaned transaction data
+    """
+    if not CACHE_DIR:
+        return
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        df.to_parquet(_cache_path(statement_id))
+    except Exception as e:
+        print(f"❌ Error caching statement: {str(e)}")
+
+
 if __name__ == "__main__":
     pass
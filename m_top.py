@@ -25,8 +25,15 @@ Dependencies:
 """
 
 import streamlit as st
-import pandas as pd
-from load_wrangle import load_pdf_data, clean_data
+import numpy as np
+from load_wrangle import (
+    load_pdf_data,
+    clean_data,
+    summarize_categories,
+    statement_hash,
+    load_cached_data,
+    save_cached_data,
+)
 import plotly.express as px
 
 # Import utility modules
@@ -42,6 +49,16 @@ PX_TEMPLATE = "ggplot2"
 COLOR_SCALE = "Blue"
 N_LARGEST = 9
 
+# Columns read by the analysis sections
+ANALYSIS_COLUMNS = [
+    "type_class_category",
+    "type_desc",
+    "entity",
+    "entity_clean",
+    "withdrawn",
+    "paid_in",
+]
+
 # App configuration
 st.set_page_config(
     layout="wide",
@@ -92,14 +109,42 @@ if st.session_state.get("process_clicked") and st.session_state.pdf_path is not
 
     @st.cache_data(show_spinner="Extracting and cleaning your statement...")
     def load_and_clean(pdf_file, password):
-        df = load_pdf_data(pdf_file, password)
-        df_cleaned = clean_data(df)
-        return df_cleaned
+        # Reuse a statement cleaned in an earlier session if it is on disk
+        statement_id = statement_hash(pdf_file.getvalue(), password)
+        df_cleaned = load_cached_data(statement_id)
+        if df_cleaned is None:
+            df = load_pdf_data(pdf_file, password)
+            df_cleaned = clean_data(df)
+            save_cached_data(statement_id, df_cleaned)
+
+        # Month filter options mapped to their period ordinals, sorted chronologically
+        months = (
+            df_cleaned["date_time"]
+            .dt.to_period("M")
+            .dropna()
+            .drop_duplicates()
+            .sort_values()
+        )
+        month_options = dict(
+            zip(months.dt.strftime("%B_%Y"), months.astype("int64").tolist())
+        )
 
-    try:
-        df_cleaned = load_and_clean(
-            st.session_state.pdf_path, st.session_state.pdf_password
+        # Statement period shown in the sidebar
+        date_span = (
+            df_cleaned["date_time"].min().strftime("%H:%M - %B %d, %Y"),
+            df_cleaned["date_time"].max().strftime("%H:%M - %B %d, %Y"),
         )
+        return df_cleaned, month_options, date_span, statement_id
+
+    try:
+        (
+            df_cleaned,
+            st.session_state.month_options,
+            st.session_state.date_span,
+            st.session_state.statement_id,
+        ) = load_and_clean(st.session_state.pdf_path, st.session_state.pdf_password)
+        # Sorted transaction times used to slice date ranges with searchsorted
+        st.session_state.dt_array = df_cleaned["date_time"].to_numpy()
         st.session_state.load_error = None
     except Exception as e:
         st.session_state.load_error = str(e)
@@ -119,8 +164,7 @@ st.sidebar.markdown("---")
 st.sidebar.subheader("Filter Options")
 st.sidebar.text(
     f"Analyzing transactions from "
-    f"{df_cleaned['date_time'].min().strftime('%H:%M - %B %d, %Y')} to "  # type: ignore
-    f"{df_cleaned['date_time'].max().strftime('%H:%M - %B %d, %Y')}"  # type: ignore
+    f"{st.session_state.date_span[0]} to {st.session_state.date_span[1]}"
 )
 st.sidebar.markdown("---")
 N_LARGEST = st.sidebar.number_input(
@@ -158,6 +202,12 @@ month_toggle = st.sidebar.toggle(
 
 filtered_df = df_cleaned  # Default to the full DataFrame
 
+# Identify the loaded statement so cached sections are reused across reruns.
+# The section caches are shared by every session and skip hashing the frames,
+# so the key must be unique to the statement: use its content hash.
+statement_key = st.session_state.statement_id
+filter_key = (statement_key, "all")
+
 if st.session_state.get("date_filter"):
     st.sidebar.subheader("Date Range Filter")
     date_range = st.sidebar.date_input(
@@ -172,38 +222,45 @@ if st.session_state.get("date_filter"):
 
     if len(date_range) == 2:
         start_date, end_date = date_range
-        mask = (df_cleaned["date_time"] >= pd.to_datetime(start_date)) & (  # type: ignore
-            df_cleaned["date_time"] <= pd.to_datetime(end_date)  # type: ignore
+        # Rows are sorted by date_time, so the range is a contiguous slice
+        lo, hi = np.searchsorted(
+            st.session_state.dt_array,
+            [
+                np.datetime64(start_date),
+                np.datetime64(end_date, "D") + np.timedelta64(1, "D"),
+            ],
         )
-        filtered_df = df_cleaned.loc[mask]  # type: ignore
+        filtered_df = df_cleaned.iloc[lo:hi]  # type: ignore
+        filter_key = (statement_key, "date", start_date, end_date)
     else:
         st.sidebar.warning("Please select both start and end dates")
 
 
 elif st.session_state.get("month_filter"):
     st.sidebar.subheader("Month Filter")
-    month_list = list(
-        df_cleaned["date_time"].dt.month_name()  # type: ignore
-        + "_"
-        + df_cleaned["date_time"].dt.year.astype(str)  # type: ignore
-    )
-    month_list = sorted(
-        set(month_list),
-        key=lambda x: pd.to_datetime(x.split("_")[0] + " 1, " + x.split("_")[1]),
-    )
+    month_options = st.session_state.month_options
+    month_list = list(month_options)
     month = st.sidebar.segmented_control(
         "Select Month",
         options=month_list,
         selection_mode="multi",
         default=month_list[0:3] if len(month_list) >= 3 else month_list,
     )
-    filtered_df = df_cleaned[df_cleaned["date_time"].dt.strftime("%B_%Y").isin(month)]  # type: ignore
+    selected_ords = [month_options[m] for m in month]
+    filtered_df = df_cleaned[df_cleaned["month_ord"].isin(selected_ords)]  # type: ignore
+    filter_key = (statement_key, "month", tuple(month))
 st.divider()
 
+# Narrow view of the filtered transactions shared by all sections
+analytics_df = filtered_df[ANALYSIS_COLUMNS]  # type: ignore
+
+# Group the filtered transactions once for all category sections
+category_totals = summarize_categories(analytics_df)
+
 # --- Merchant Payments Section ---
 
 topMerchant_fig, totalspend, totalcharges, merchantCount, merchantFrame = merchant_box(
-    filtered_df, N_LARGEST, COLOR_SCALE, PX_TEMPLATE
+    category_totals, filter_key, N_LARGEST, COLOR_SCALE, PX_TEMPLATE
 )
 
 if merchantCount > 0:
@@ -221,9 +278,7 @@ if merchantCount > 0:
         st.metric("Charges incurred", f"Ksh. {totalcharges:.2f}")
         st.markdown("---")
         st.dataframe(
-            merchantFrame[["entity", "count"]]
-            .sort_values(by="count", ascending=False)
-            .head(N_LARGEST),
+            merchantFrame[["entity", "count"]],
             use_container_width=True,
             hide_index=True,
             column_config={
@@ -240,7 +295,7 @@ if merchantCount > 0:
     paybill1, paybill2 = st.columns([2, 1])
 
     toppaybill_fig, totalsent, totalpbcharges, paybillFrame, pbtranactions = (
-        paybill_box(filtered_df, N_LARGEST, COLOR_SCALE, PX_TEMPLATE)
+        paybill_box(analytics_df, filter_key, N_LARGEST, COLOR_SCALE, PX_TEMPLATE)
     )
 
     with paybill1:
@@ -254,9 +309,7 @@ if merchantCount > 0:
         st.metric("Charges incurred", f"Ksh. {totalpbcharges:,.2f}")
         st.markdown("---")
         st.dataframe(
-            paybillFrame[["entity2", "count"]]
-            .sort_values(by="count", ascending=False)
-            .head(N_LARGEST),
+            paybillFrame[["entity2", "count"]],
             use_container_width=True,
             hide_index=True,
             column_config={
@@ -273,7 +326,7 @@ else:
 # --- Customer Transfer Section ---
 
 topTransfer_fig, totalspend, totalcharges, totaltransferTransactions, transferFrame = (
-    customer_transfer_box(filtered_df, N_LARGEST, COLOR_SCALE, PX_TEMPLATE)
+    customer_transfer_box(analytics_df, filter_key, N_LARGEST, COLOR_SCALE, PX_TEMPLATE)
 )
 if totaltransferTransactions > 0:
     st.header("💸💸 Cash Transfers (Send Money)")
@@ -288,9 +341,7 @@ if totaltransferTransactions > 0:
         st.metric("Charges incurred", f"Ksh. {totalcharges:,.2f}")
         st.markdown("---")
         st.dataframe(
-            transferFrame[["entity", "count"]]
-            .sort_values(by="count", ascending=False)
-            .head(N_LARGEST),
+            transferFrame[["entity", "count"]],
             use_container_width=True,
             hide_index=True,
             column_config={
@@ -309,7 +360,7 @@ else:
     totalreceived,
     totalreceivedTransactions,
     receiveFrame,
-) = receive_money_box(filtered_df, N_LARGEST, COLOR_SCALE, PX_TEMPLATE)
+) = receive_money_box(analytics_df, filter_key, N_LARGEST, COLOR_SCALE, PX_TEMPLATE)
 
 if totalreceivedTransactions > 0:
     st.header("📥 Received Money (From Individuals and Business)")
@@ -323,9 +374,7 @@ if totalreceivedTransactions > 0:
         st.metric("Total Received", f"{totalreceived:,.2f} KES")
         st.markdown("---")
         st.dataframe(
-            receiveFrame[["entity", "count"]]
-            .sort_values(by="count", ascending=False)
-            .head(N_LARGEST),
+            receiveFrame[["entity", "count"]],
             use_container_width=True,
             hide_index=True,
             column_config={
@@ -343,7 +392,9 @@ else:
     withdrawalcharges,
     totalWithdrawals,
     withdrawalFrame,
-) = cash_withdrawal_box(filtered_df, N_LARGEST, COLOR_SCALE, PX_TEMPLATE)
+) = cash_withdrawal_box(
+    category_totals, filter_key, N_LARGEST, COLOR_SCALE, PX_TEMPLATE
+)
 
 
 
@@ -361,9 +412,7 @@ if totalWithdrawals > 0:
         st.metric("Total Charges", f"{withdrawalcharges} KES")
         st.markdown("---")
         st.dataframe(
-            withdrawalFrame[["entity", "count"]]
-            .sort_values(by="count", ascending=False)
-            .head(N_LARGEST),
+            withdrawalFrame[["entity", "count"]],
             use_container_width=True,
             hide_index=True,
             column_config={
@@ -378,7 +427,7 @@ else:
 
 # --- Airtime Section ---
 topAirtime_fig, totalairtime, totalairtimetransactions, airtimeFrame = airtime_box(
-    filtered_df, N_LARGEST, COLOR_SCALE, PX_TEMPLATE
+    category_totals, filter_key, N_LARGEST, COLOR_SCALE, PX_TEMPLATE
 )
 
 if totalairtime > 0:
@@ -404,25 +453,3 @@ if st.button("Upload a new statement"):
     for key in ["pdf_uploaded", "pdf_path", "pdf_password"]:
         if key in st.session_state:
             del st.session_state[key]
-
-# Main application logic
-def main():
-    """
-    Main application function that handles:
-        1. File upload and processing
-        2. Data filtering
-        3. Visualization generation
-        4. Displaying results in the Streamlit app"""
-    # --- Session State Initialization ---
-    if "pdf_path" not in st.session_state:
-        st.session_state.pdf_path = None
-    if "pdf_password" not in st.session_state:
-        st.session_state.pdf_password = ""
-    if "process_clicked" not in st.session_state:
-        st.session_state.process_clicked = False
-    if "load_error" not in st.session_state:
-        st.session_state.load_error = None
-
-# Run the main application
-if __name__ == "__main__":
-    main()
\ No newline at end of file
@@ -8,63 +8,58 @@ Functions:
     airtime_box: Creates visualizations and analytics for airtime purchases
 """
 
-import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
 
 
-def airtime_box(filtered_df, nlargest, color, template):
+@st.cache_data(show_spinner=False)
+def airtime_box(_category_totals, filter_key, nlargest, color, template):
     """
     Analyze airtime purchase transactions and create visualization.
 
     Args:
-        filtered_df (pd.DataFrame): DataFrame containing M-Pesa transaction data with columns:
-            - type_class: Transaction type classification
-            - entity: Provider/recipient name
-            - withdrawn: Transaction amount
+        _category_totals (dict): Per-category entity totals from summarize_categories,
+            each indexed by provider/recipient name with count and sum columns
+        filter_key (tuple): Hashable statement and filter bounds used as the cache key
         nlargest (int): Number of top entries to display
         color (str): Color scale name for the visualization
         template (str): Plotly template name for consistent styling
 
     Returns:
         tuple: Contains:
-            - plotly.Figure: Bar chart showing airtime purchases by provider
+            - plotly.Figure: Pie chart showing airtime purchases by provider
             - int: Total airtime purchase amount
     """
 
-    # Filter and aggregate airtime transactions
+    # Look up the pre-aggregated airtime transactions
     airtimeFrame = (
-        filtered_df[filtered_df["type_class"].str.contains("Airtime", na=False)]
-        .groupby("entity")
-        .agg(
-            count=("withdrawn", "count"),  # Number of purchases per provider
-            sum=("withdrawn", "sum"),  # Total amount spent per provider
-        )
+        _category_totals["Airtime"]
         .sort_values(by="sum")
         .reset_index()
     )
 
-    # Create bar chart visualization
-    topAirtime_fig = px.pie(
-        airtimeFrame.nlargest(nlargest, "sum").sort_values(by="sum", ascending=False),
-        values="sum",
-        names="entity",
-        # color_discrete_sequence=px.colors.sequential[color],
+    # Create pie chart visualization
+    topAirtime = airtimeFrame.nlargest(nlargest, "sum")  # Already in descending order
+    topAirtime_fig = go.Figure(
+        go.Pie(
+            values=topAirtime["sum"].to_numpy(),
+            labels=topAirtime["entity"].to_numpy(),
+            customdata=topAirtime["count"].to_numpy(),  # Show purchase count in hover tooltip
+            name="",
+            sort=False,  # Keep the nlargest order instead of re-sorting in the browser
+            texttemplate="Ksh. %{value:,}",  # Format amounts with currency and commas
+            hovertemplate="%{customdata} transaction(s) | %{value:,} Ksh | %{label}",
+            textposition="auto",
+        )
+    ).update_layout(
         template=template,
         title="Airtime Purchases",
-        hover_data=["count"],  # Show purchase count in hover tooltip
-    ).update_layout(
         dragmode = False,
         height=500  # Fixed height since pie chart doesn't need dynamic sizing
     )
 
-    # Configure hover and text display formats
-    topAirtime_fig.update_traces(
-        texttemplate="Ksh. %{value:,}",  # Format amounts with currency and commas
-        hovertemplate="%{customdata} transaction(s) | %{x:,} Ksh | %{y}",
-        textposition="auto",
-    )
-
     # Calculate total airtime spend
-    totalairtime = airtimeFrame["sum"].sum().astype(int)
-    totalairtimetransactions = airtimeFrame["count"].sum()
+    totalairtime = int(airtimeFrame["sum"].to_numpy().sum())
+    totalairtimetransactions = int(airtimeFrame["count"].to_numpy().sum())
 
     return topAirtime_fig, totalairtime, totalairtimetransactions, airtimeFrame
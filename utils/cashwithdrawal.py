@@ -8,18 +8,19 @@ Functions:
     cash_withdrawal_box: Creates visualizations and analytics for cash withdrawals
 """
 
-import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
 
 
-def cash_withdrawal_box(filtered_df, nlargest, color, template):
+@st.cache_data(show_spinner=False)
+def cash_withdrawal_box(_category_totals, filter_key, nlargest, color, template):
     """
     Analyze cash withdrawal transactions and create visualization.
 
     Args:
-        filtered_df (pd.DataFrame): DataFrame containing M-Pesa transaction data with columns:
-            - type_class: Transaction type classification
-            - entity: Agent/ATM location
-            - withdrawn: Transaction amount
+        _category_totals (dict): Per-category entity totals from summarize_categories,
+            each indexed by agent/ATM location with count and sum columns
+        filter_key (tuple): Hashable statement and filter bounds used as the cache key
         nlargest (int): Number of top locations to display
         color (str): Color scale name for the visualization
         template (str): Plotly template name for consistent styling
@@ -30,32 +31,28 @@ def cash_withdrawal_box(filtered_df, nlargest, color, template):
             - int: Total withdrawal amount
             - float: Total withdrawal charges
             - int: Total number of withdrawals
-            - pd.DataFrame: Detailed withdrawal location data
+            - pd.DataFrame: Top withdrawal locations by number of withdrawals
     """
 
-    # Filter and aggregate withdrawal transactions
-    withdrawalFrame = (
-        filtered_df[filtered_df["type_class"].str.contains("Customer Withdrawal", na=False)]
-        .groupby("entity")
-        .agg(
-            count=("withdrawn", "count"),  # Number of withdrawals per location
-            sum=("withdrawn", "sum"),  # Total amount withdrawn per location
-        )
-        .sort_values(by="sum", ascending=False)
-        .reset_index()
-    )
+    # Look up the pre-aggregated withdrawal transactions
+    withdrawalFrame = _category_totals["Customer Withdrawal"].reset_index()
 
     # Create bar chart visualization
-    topWithdrawal_fig = px.bar(
-        withdrawalFrame.head(nlargest).sort_values(by="sum", ascending=True),
-        x="sum",
-        y="entity",
-        color_continuous_scale=color,
+    topWithdrawals = withdrawalFrame.nlargest(nlargest, "sum")[::-1]  # Largest bar at the top
+    topWithdrawal_fig = go.Figure(
+        go.Bar(
+            x=topWithdrawals["sum"].to_numpy(),
+            y=topWithdrawals["entity"].to_numpy(),
+            customdata=topWithdrawals["count"].to_numpy(),  # Show withdrawal count in hover tooltip
+            orientation="h",
+            name="",
+            texttemplate="Ksh. %{value:,}",  # Format amounts with currency and commas
+            hovertemplate="%{customdata} transaction(s) | %{x:,} Ksh | %{y}",
+            textposition="auto",
+        )
+    ).update_layout(
         template=template,
         title="Cash Withdrawals by Location",
-        hover_data="count",  # Show withdrawal count in hover tooltip
-        text="sum",  # Display amount on bars
-    ).update_layout(
         xaxis_title="",
         yaxis_title="",
         xaxis=dict(showticklabels=False),
@@ -63,33 +60,21 @@ def cash_withdrawal_box(filtered_df, nlargest, color, template):
         dragmode = False,
     )
 
-    # Configure hover and text display formats
-    topWithdrawal_fig.update_traces(
-        texttemplate="Ksh. %{value:,}",  # Format amounts with currency and commas
-        hovertemplate="%{customdata} transaction(s) | %{x:,} Ksh | %{y}",
-        textposition="auto",
-    )
-
     # Calculate summary statistics
-    totalwithdrawal = withdrawalFrame["sum"].sum().astype(int)
+    totalwithdrawal = int(withdrawalFrame["sum"].to_numpy().sum())
     
     # Calculate total withdrawal charges
     totalcharges = round(
-        float(
-            filtered_df[filtered_df["type_class"].str.contains("Cash Withdrawal", na=False)][
-                "withdrawn"
-            ].sum()
-        ),
-        1,
+        float(_category_totals["Cash Withdrawal"]["sum"].to_numpy().sum()), 1
     )
 
     # Get total number of withdrawals
-    totalWithdrawals = withdrawalFrame["count"].sum()
+    totalWithdrawals = int(withdrawalFrame["count"].to_numpy().sum())
 
     return (
         topWithdrawal_fig,
         totalwithdrawal,
         totalcharges,
         totalWithdrawals,
-        withdrawalFrame,
+        withdrawalFrame.nlargest(nlargest, "count"),
     )
@@ -13,14 +13,16 @@ Features:
 
 Dependencies:
     - pandas: For data manipulation
-    - plotly.express: For interactive visualizations
+    - plotly.graph_objects: For interactive visualizations
     - millify: For number formatting
 """
 
-import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
 import pandas as pd
 
-def customer_transfer_box(filtered_df, nlargest, color, template):
+@st.cache_data(show_spinner=False)
+def customer_transfer_box(_filtered_df, filter_key, nlargest, color, template):
     """
     Analyze customer transfer transactions and create visualization dashboard.
 
@@ -28,11 +30,12 @@ def customer_transfer_box(filtered_df, nlargest, color, template):
     phone numbers and creating visualizations of transfer patterns.
 
     Args:
-        filtered_df (pd.DataFrame): DataFrame containing M-Pesa transaction data with columns:
-            - type_class: Transaction type classification
-            - entity: Recipient name/identifier 
+        _filtered_df (pd.DataFrame): DataFrame containing M-Pesa transaction data with columns:
+            - type_class_category: Transaction category
+            - entity_clean: Recipient name without masked phone number
             - withdrawn: Transaction amount
             - type_desc: Transaction description
+        filter_key (tuple): Hashable statement and filter bounds used as the cache key
         nlargest (int): Number of top recipients to display in visualizations
         color (str): Color scale name for the visualization
         template (str): Plotly template name for consistent styling
@@ -43,64 +46,58 @@ def customer_transfer_box(filtered_df, nlargest, color, template):
             - int: Total transfer amount
             - float: Total transfer charges
             - int: Total number of transfers
-            - pd.DataFrame: Detailed transfer data by recipient
+            - pd.DataFrame: Top recipients by number of transfers
 
     Example:
-        >>> fig, total, charges, count, data = customer_transfer_box(df, 10, 'viridis', 'plotly_white')
+        >>> fig, total, charges, count, data = customer_transfer_box(df, key, 10, 'viridis', 'plotly_white')
         >>> fig.show()
     """
 
-    # Filter for transfer transactions and separate charges
-    transferFrame = filtered_df[
-        filtered_df["type_class"].str.contains("Customer Transfer", na=False)
+    # Filter for transfer transactions, keeping only the columns used below
+    transferFrame = _filtered_df.loc[
+        _filtered_df["type_class_category"].eq("Customer Transfer"),
+        ["entity_clean", "withdrawn", "type_desc"],
     ]
-    transferChargesFrame = transferFrame[transferFrame["type_desc"] == "of Funds Charge"]
-    transferFrame = transferFrame[transferFrame["type_desc"] != "of Funds Charge"]
-
-    # Clean up recipient names and handle masked phone numbers
-    mask = transferFrame["entity"].str.contains(r"\*+", regex=True)
-    try:
-        # Extract actual name from masked format (e.g., "254*****123 John Doe" -> "John Doe")
-        transferFrame.loc[mask, "entity"] = (
-            transferFrame.loc[mask, "entity"].str.partition(" ")[2].str.title()
-        )
-    except Exception as e:
-        # Fallback formatting for non-masked names
-        transferFrame.loc[~mask, "entity"] = transferFrame.loc[~mask, "entity"].str.title()
 
-    # Aggregate transfer data by recipient
+    # Separate charges from the transfers themselves
+    isCharge = (
+        transferFrame["type_desc"]
+        .eq("of Funds Charge")
+        .to_numpy(dtype=bool, na_value=False)
+    )
+    transferCharges = float(transferFrame["withdrawn"].to_numpy()[isCharge].sum())
+    transferFrame = transferFrame.loc[~isCharge, ["entity_clean", "withdrawn"]]
+
+    # Aggregate transfer data by recipient, using the names cleaned at load time
     transferFrame = (
-        transferFrame.groupby("entity")
+        transferFrame.groupby("entity_clean", observed=True, sort=False)["withdrawn"]
         .agg(
-            count=("withdrawn", "count"),  # Number of transfers per recipient
-            sum=("withdrawn", "sum"),      # Total amount sent per recipient
+            count="size",  # Number of transfers per recipient
+            sum="sum",     # Total amount sent per recipient
         )
-        .sort_values(by="sum", ascending=False)
+        .rename_axis("entity")
         .reset_index()
     )
 
     # Get total number of transfers
-    totalTransactions = transferFrame["count"].sum()
-
-    # Calculate total transfer charges
-    transferChargesFrame = (
-        transferChargesFrame.groupby("type_class")
-        .agg(sum=("withdrawn", "sum"))
-        .sort_values(by="sum", ascending=False)
-        .reset_index()
-    ).iloc[0, 1]
+    totalTransactions = int(transferFrame["count"].to_numpy().sum())
 
     # Create bar chart visualization for top recipients
-    topTransfer_fig = px.bar(
-        transferFrame.head(nlargest).sort_values(by="sum", key=abs, ascending=True),
-        x="sum",
-        y="entity",
-        color_continuous_scale=color,
+    topTransfers = transferFrame.nlargest(nlargest, "sum")[::-1]  # Largest bar at the top
+    topTransfer_fig = go.Figure(
+        go.Bar(
+            x=topTransfers["sum"].to_numpy(),
+            y=topTransfers["entity"].to_numpy(),
+            customdata=topTransfers["count"].to_numpy(),  # Show transfer count in hover tooltip
+            orientation="h",
+            name="",
+            texttemplate="Ksh. %{value:,}",  # Format amounts with currency and commas
+            hovertemplate="%{customdata} transfer(s) | %{x:,} Ksh | %{y}",
+            textposition="auto",
+        )
+    ).update_layout(
         template=template,
         title=f"These are the top {nlargest} Individuals you sent money",
-        hover_data="count",  # Show transfer count in hover tooltip
-        text="sum",         # Display amount on bars
-    ).update_layout(
         xaxis_title="",
         yaxis_title="",
         xaxis=dict(showticklabels=False),
@@ -108,15 +105,14 @@ def customer_transfer_box(filtered_df, nlargest, color, template):
         height=((nlargest - 1) * 100),  # Dynamic height based on number of merchants
         )
 
-    # Configure hover and text display formats
-    topTransfer_fig.update_traces(
-        texttemplate="Ksh. %{value:,}",  # Format amounts with currency and commas
-        hovertemplate="%{customdata} transfer(s) | %{x:,} Ksh | %{y}",
-        textposition="auto",
-    )
-
     # Calculate summary statistics
-    totalspend = transferFrame["sum"].sum().astype(int)  # Total amount transferred
-    totalcharges = transferChargesFrame  # Total transfer charges
-
-    return (topTransfer_fig, totalspend, totalcharges, totalTransactions, transferFrame)
\ No newline at end of file
+    totalspend = int(transferFrame["sum"].to_numpy().sum())  # Total amount transferred
+    totalcharges = transferCharges  # Total transfer charges
+
+    return (
+        topTransfer_fig,
+        totalspend,
+        totalcharges,
+        totalTransactions,
+        transferFrame.nlargest(nlargest, "count"),
+    )
@@ -9,14 +9,17 @@ Main function:
     merchant_box: Creates visualizations and analytics for merchant payment transactions
 
 Dependencies:
-    - plotly.express: For creating interactive visualizations
+    - plotly.graph_objects: For creating interactive visualizations
 """
 
-import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
 
 
+@st.cache_data(show_spinner=False)
 def merchant_box(
-    filtered_df,
+    _category_totals,
+    filter_key,
     nlargest,
     color,
     template,
@@ -28,10 +31,9 @@ def merchant_box(
     about spending patterns, top merchants, and transaction volumes.
 
     Args:
-        filtered_df (pd.DataFrame): DataFrame containing M-Pesa transaction data with columns:
-            - type_class: Transaction type classification
-            - entity: Merchant name/identifier
-            - withdrawn: Transaction amount
+        _category_totals (dict): Per-category entity totals from summarize_categories,
+            each indexed by merchant name/identifier with count and sum columns
+        filter_key (tuple): Hashable statement and filter bounds used as the cache key
         nlargest (int): Number of top merchants to display in visualizations
         color (str): Color scale name for the visualization (plotly color scale)
         template (str): Plotly template name for consistent styling
@@ -42,36 +44,32 @@ def merchant_box(
             - float: Total spend amount across all merchants
             - float: Total transaction charges
             - int: Total number of merchant transactions
-            - pd.DataFrame: Detailed merchant transaction data
+            - pd.DataFrame: Top merchants by number of transactions
 
     Example:
-        >>> fig, total, charges, count, data = merchant_box(df, 10, 'viridis', 'plotly_white')
+        >>> fig, total, charges, count, data = merchant_box(totals, key, 10, 'viridis', 'plotly_white')
         >>> fig.show()
     """
 
-    # Filter and aggregate merchant payment transactions
-    merchantFrame = (
-        filtered_df[filtered_df["type_class"].str.contains("Merchant Payment")]
-        .groupby("entity")
-        .agg(
-            count=("withdrawn", "count"),  # Number of transactions per merchant
-            sum=("withdrawn", "sum"),  # Total amount spent per merchant
-        )
-        .sort_values(by="sum", ascending=False)
-        .reset_index()
-    )
+    # Look up the pre-aggregated merchant payment transactions
+    merchantFrame = _category_totals["Merchant Payment"].reset_index()
 
     # Create bar chart visualization for top merchants
-    topMerchant_fig = px.bar(
-        merchantFrame.head(nlargest).sort_values(by="sum", ascending=True),
-        x="sum",
-        y="entity",
-        color_continuous_scale=color,
+    topMerchants = merchantFrame.nlargest(nlargest, "sum")[::-1]  # Largest bar at the top
+    topMerchant_fig = go.Figure(
+        go.Bar(
+            x=topMerchants["sum"].to_numpy(),
+            y=topMerchants["entity"].to_numpy(),
+            customdata=topMerchants["count"].to_numpy(),  # Show transaction count in hover tooltip
+            orientation="h",
+            name="",
+            texttemplate="Ksh. %{value:,}",  # Format amounts with currency and commas
+            hovertemplate="%{customdata} transaction(s) | %{x:,} Ksh | %{y}",
+            textposition="auto",
+        )
+    ).update_layout(
         template=template,
         title=f"These are the top {nlargest} merchants you paid with Buy Goods",
-        hover_data="count",  # Show transaction count in hover tooltip
-        text="sum",  # Display amount on bars
-    ).update_layout(
         xaxis_title="",
         yaxis_title="",
         dragmode = False,
@@ -79,23 +77,21 @@ def merchant_box(
         height=((nlargest - 1) * 100),  # Dynamic height based on number of merchants
     )
 
-    # Configure hover and text display formats
-    topMerchant_fig.update_traces(
-        texttemplate="Ksh. %{value:,}",  # Format amounts with currency and commas
-        hovertemplate="%{customdata} transaction(s) | %{x:,} Ksh | %{y}",
-        textposition="auto",
-    )
-
     # Calculate summary statistics
-    totalspend = merchantFrame["sum"].sum()  # Total amount spent across all merchants
+    totalspend = float(merchantFrame["sum"].to_numpy().sum())  # Total amount spent across all merchants
     
     # Calculate total merchant payment charges
     totalcharges = round(
-        float(filtered_df[filtered_df["type_class"]
-                        .str.contains("Pay Merchant")]
-                ["withdrawn"].sum()), 2,)
+        float(_category_totals["Pay Merchant"]["sum"].to_numpy().sum()), 2
+    )
 
     # Get total number of merchant transactions
-    merchantCount = merchantFrame["count"].sum()
-
-    return topMerchant_fig, totalspend, totalcharges, merchantCount, merchantFrame
+    merchantCount = int(merchantFrame["count"].to_numpy().sum())
+
+    return (
+        topMerchant_fig,
+        totalspend,
+        totalcharges,
+        merchantCount,
+        merchantFrame.nlargest(nlargest, "count"),
+    )
@@ -1,8 +1,13 @@
-import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
+import pandas as pd
+import numpy as np
 
 
+@st.cache_data(show_spinner=False)
 def paybill_box(
-    filtered_df,
+    _filtered_df,
+    filter_key,
     nlargest,
     color,
     template,
@@ -10,7 +15,8 @@ def paybill_box(
     """Analyze paybill transactions and create visualization.
 
     Args:
-        filtered_df (pd.DataFrame): DataFrame containing transaction data
+        _filtered_df (pd.DataFrame): DataFrame containing transaction data
+        filter_key (tuple): Hashable statement and filter bounds used as the cache key
         nlargest (int): Number of top recipients to display
         color (str): Color scale for the visualization
         template (str): Plotly template name
@@ -18,75 +24,95 @@ def paybill_box(
     Returns:
         tuple: Contains:
             - plotly.Figure: Bar chart of top recipients
-            - plotly.Figure: Histogram of transaction amounts
-            - str: Total sent amount (formatted)
-            - int: Total charges
-            - dict: Top 3 recipients by transaction count
+            - int: Total sent amount
+            - float: Total charges
+            - pd.DataFrame: Top recipients by number of payments
+            - int: Total number of payments
     """
 
-    paybillFrame = filtered_df[
-        filtered_df["type_class"].str.contains("Pay Bill", na=False)
-        & ~filtered_df["type_desc"].str.contains("Charge", na=False)
-    ]
+    # Evaluate the Pay Bill and charge masks once and reuse them for both frames
+    isPaybill = _filtered_df["type_class_category"].eq("Pay Bill")
+    isCharge = _filtered_df["type_desc"].str.contains("Charge", na=False)
+
+    # Only carry the columns the aggregations below use
+    paybillFrame = _filtered_df.loc[isPaybill & ~isCharge, ["entity", "withdrawn"]]
 
     paybillCharges_df = (
-        filtered_df[
-            filtered_df["type_class"].str.contains("Pay Bill", na=False)
-            & filtered_df["type_desc"].str.contains("Charge", na=False)
-        ]
+        _filtered_df.loc[isPaybill & isCharge, ["entity", "withdrawn"]]
         .groupby("entity")
         .agg(count=("entity", "count"), total=("withdrawn", "sum"))
     )
     paybillCharges = paybillCharges_df.iloc[0, 1] if not paybillCharges_df.empty else 0
 
-    def agg_concat(x):
-        return ", ".join(map(str, x))
+    # Totals come straight from the filtered rows; the groupby is only for the chart
+    totalsent = int(paybillFrame["withdrawn"].to_numpy().sum())
+    totaltransactions = len(paybillFrame)
 
-    paybillFrame[["entity2", "accounts"]] = paybillFrame["entity"].str.extract(
-        r"(.*?)(?:\s+Acc\.\s+(.*)|$)"
+    # Split "BUSINESS NAME Acc. 12345" into the business and account number
+    parts = (
+        paybillFrame["entity"]
+        .str.split(" Acc. ", n=1, expand=True, regex=False)
+        .reindex(columns=[0, 1])  # Keep the accounts column when no row has one
     )
+    paybillFrame = paybillFrame.assign(entity2=parts[0], accounts=parts[1].fillna(""))
 
-    paybillFrame = (
-        paybillFrame.groupby("entity2")
-        .agg(
-            count=("entity", "count"),
-            sum=("withdrawn", "sum"),
-            accounts=("accounts", agg_concat),
-        )
-        .sort_values(by="sum", ascending=False)
-        .reset_index()
+    # Count and sum per business on the factorized codes; rows without a name get -1
+    codes, businesses = pd.factorize(paybillFrame["entity2"], sort=False)
+    named = codes >= 0
+    counts = np.bincount(codes[named], minlength=len(businesses))
+    sums = np.bincount(
+        codes[named],
+        weights=paybillFrame["withdrawn"].to_numpy()[named],
+        minlength=len(businesses),
+    )
+
+    # Top businesses by sum, ascending so the largest bar is at the top
+    if nlargest < len(sums):
+        top = np.argpartition(-sums, nlargest - 1)[:nlargest]
+    else:
+        top = np.arange(len(sums))
+    top = top[np.argsort(sums[top], kind="stable")]
+
+    # Only join the account numbers of the businesses shown in the chart
+    inTop = np.isin(codes, top)
+    accounts = (
+        paybillFrame.loc[inTop, "accounts"]
+        .groupby(codes[inTop], sort=False)
+        .agg(", ".join)
+        .reindex(top)
+        .to_numpy(dtype=object)
     )
 
     # Bar chart for top recipients
-    toppaybill_fig = px.bar(
-        paybillFrame.head(nlargest).sort_values(by="sum", ascending=True),
-        x="sum",
-        y="entity2",
+    toppaybill_fig = go.Figure(
+        go.Bar(
+            x=sums[top],
+            y=businesses[top].to_numpy(),
+            customdata=np.column_stack((counts[top].astype(object), accounts)),  # Show transaction count and accounts in hover tooltip
+            orientation="h",
+            name="",
+            texttemplate="Ksh. %{value:,}",
+            hovertemplate="%{customdata[0]} transaction(s) | %{x:,} Ksh | %{y}<br>To these accounts <br> %{customdata[1]}",
+            textposition="auto",
+        )
+    ).update_layout(
         template=template,
         title=f"These are the top {nlargest} merchants you paid with Pay Bill",
-        hover_data=["count", "accounts"],  # Show transaction count and accounts in hover tooltip
-        text="sum",
-    ).update_layout(
         xaxis_title="",
         yaxis_title="",
         xaxis=dict(showticklabels=False),
         dragmode = False,
         height=((nlargest - 1) * 100),  # Dynamic height based on number of merchants
     )
-    toppaybill_fig.update_traces(
-        texttemplate="Ksh. %{value:,}",
-        hovertemplate="%{customdata[0]} transaction(s) | %{x:,} Ksh | %{y}<br>To these accounts <br> %{customdata[1]}",
-        textposition="auto",
-    )
 
-    totalsent = paybillFrame["sum"].sum().astype(int)
     totalcharges = round(paybillCharges, 2)
-    totaltransactions = paybillFrame["count"].sum()
+
+    paybillFrame = pd.DataFrame({"entity2": businesses, "count": counts, "sum": sums})
 
     return (
         toppaybill_fig,
         totalsent,
         totalcharges,
-        paybillFrame,
+        paybillFrame.nlargest(nlargest, "count"),
         totaltransactions,
     )
@@ -1,9 +1,12 @@
-import plotly.express as px
-import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+import numpy as np
 
 
+@st.cache_data(show_spinner=False)
 def receive_money_box(
-    filtered_df,
+    _filtered_df,
+    filter_key,
     nlargest,
     color,
     template,
@@ -11,7 +14,8 @@ def receive_money_box(
     """Analyze receive money transactions and create visualization.
 
     Args:
-        filtered_df (pd.DataFrame): DataFrame containing transaction data
+        _filtered_df (pd.DataFrame): DataFrame containing transaction data
+        filter_key (tuple): Hashable statement and filter bounds used as the cache key
         nlargest (int): Number of top senders to display
         color (str): Color scale for the visualization
         template (str): Plotly template name
@@ -19,81 +23,70 @@ def receive_money_box(
     Returns:
         tuple: Contains:
             - plotly.Figure: Bar chart of top money senders
-            - plotly.Figure: Time series of money received
-            - str: Total received amount (formatted)
-            - int: Average amount per transaction
-            - dict: Top 3 senders by transaction count
+            - int: Total received amount
+            - int: Total number of transactions received
+            - pd.DataFrame: Top senders by number of transactions
     """
 
     # Filter and process the DataFrame for receive money transactions
     # Because of my split_entity function, transactions from individuals end with 'from' in the type_desc column and those from businesses end with 'from Business
-    receiveFrame = filtered_df[
-        filtered_df["type_class"].str.contains("Funds received")
-        & ~filtered_df["type_desc"].str.contains("Business", na=False)
+    receiveFrame = _filtered_df.loc[
+        _filtered_df["type_class_category"].eq("Funds received"),
+        ["entity", "entity_clean", "type_desc", "paid_in"],
     ]
+    is_biz = receiveFrame["type_desc"].str.contains("Business", na=False).to_numpy(
+        dtype=bool
+    )
 
     # M-Pesa returns "2547******09 Firstname Lastname" for transactions from individuals, I'm only interested in the names part.
-    mask = receiveFrame["entity"].str.contains(r"\*+", regex=True)
-    try:
-        receiveFrame.loc[mask, "entity"] = (
-            receiveFrame.loc[mask, "entity"].str.partition(" ")[2].str.title()
-        )
-    except Exception as e:
-        print(
-            f"Error processing entity names with strategy 1: {e}, trying alternative method."
-        )
-        receiveFrame.loc[~mask, "entity"] = receiveFrame.loc[
-            ~mask, "entity"
-        ].str.title()
+    # entity_clean already holds the title-cased name from clean_data, and "" when the
+    # sender has no name, so these rows stay in the groupby and match the totals below.
+    mask = ~is_biz & receiveFrame["entity"].str.contains(
+        "*", regex=False, na=False
+    ).to_numpy(dtype=bool)
 
-    receiveFrame_business = filtered_df[
-        filtered_df["type_class"].str.contains("Funds received")
-        & filtered_df["type_desc"].str.contains("Business", na=False)
-    ]
-
-    receiveFrame = pd.concat([receiveFrame, receiveFrame_business], ignore_index=True)
+    # Totals come straight from the filtered rows; the groupby is only for the chart
+    totalreceived = int(receiveFrame["paid_in"].to_numpy().sum())
+    totalreceivedTransactions = len(receiveFrame)
 
-    receiveFrame["type_desc"] = receiveFrame["type_desc"].apply(
-        lambda x: "Individual" if str(x).endswith("from") else "Business"
+    receiveFrame = receiveFrame.assign(
+        entity=np.where(mask, receiveFrame["entity_clean"], receiveFrame["entity"]),
+        kind=np.where(is_biz, "Business", "Individual"),
     )
 
     receiveFrame = (
-        receiveFrame.groupby(["entity", "type_desc"])
+        receiveFrame[["entity", "kind", "paid_in"]]
+        .groupby(["entity", "kind"], observed=True, sort=False)
         .agg(sum=("paid_in", "sum"), count=("paid_in", "count"))
         .reset_index()
     )
 
     # Bar chart for top senders
-    topReceive_fig = px.bar(
-        receiveFrame.nlargest(nlargest, "sum").sort_values(by="sum", ascending=True),
-        x="sum",
-        y="entity",
-        color_continuous_scale=color,
+    topSenders = receiveFrame.nlargest(nlargest, "sum")[::-1]  # Largest bar at the top
+    topReceive_fig = go.Figure(
+        go.Bar(
+            x=topSenders["sum"].to_numpy(),
+            y=topSenders["entity"].to_numpy(),
+            customdata=topSenders["count"].to_numpy(),  # Show transaction count in hover tooltip
+            orientation="h",
+            name="",
+            texttemplate="Ksh. %{value:,}",
+            hovertemplate="%{customdata} transaction(s) | %{x:,} Ksh | %{y}",
+            textposition="auto",
+        )
+    ).update_layout(
         template=template,
         title=f"These are the top {nlargest} individuals & businesses you received money from",
-        hover_data="count",
-        text="sum",
-    ).update_layout(
         xaxis_title="",
         yaxis_title="",
         xaxis=dict(showticklabels=False),
-        dragmode = False,        
+        dragmode = False,
         height=((nlargest - 1) * 100),  # Dynamic height based on number of individuals/businesses
     )
 
-    topReceive_fig.update_traces(
-        texttemplate="Ksh. %{value:,}",
-        hovertemplate="%{customdata} transaction(s) | %{x:,} Ksh | %{y}",
-        textposition="auto",
-    )
-    
-
-    totalreceived = receiveFrame["sum"].sum().astype(int)
-    totalreceivedTransactions = receiveFrame["count"].sum()
-
     return (
         topReceive_fig,
         totalreceived,
         totalreceivedTransactions,
-        receiveFrame,
+        receiveFrame.nlargest(nlargest, "count"),
     )